@@ -17,7 +17,11 @@ python3 src/collectors/azure_collector.py >> discovery.log 2>&1
 echo "Running GCP Collector..."
 python3 src/collectors/gcp_collector.py >> discovery.log 2>&1
 
-# 4. Generate Report
+# 4. VMware (vCenter + NSX-T, streams results straight to the hub)
+echo "Running VMware Collector..."
+python3 -m src.collectors.vmware_collector >> discovery.log 2>&1
+
+# 5. Generate Report
 echo "Generating Report..."
 python3 src/reporting/excel_generator.py >> discovery.log 2>&1
 
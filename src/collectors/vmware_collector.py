@@ -0,0 +1,298 @@
+import math
+import re
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import dsa, ec, ed448, ed25519, rsa
+from cryptography.x509.oid import NameOID, SignatureAlgorithmOID
+from src.hub.schemas import DigitalCertificate, CertificateStatus, IngestRequest
+
+PEM_PATTERN = re.compile(r"-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----", re.DOTALL)
+NSX_MAX_PAGES = 1000  # Guard against an NSX manager that never stops returning a cursor
+ASSET_SEPARATOR = "; "
+
+class VMwareEndpoint(NamedTuple):
+    host: str  # Hostname, or a full base URL (e.g. http://127.0.0.1:8443 for a mock server)
+    kind: str  # "vcenter" or "nsx"
+    timeout: Optional[float] = None  # Total time budget for this endpoint, defaults to the collector's
+
+    @property
+    def base_url(self) -> str:
+        return self.host.rstrip("/") if "://" in self.host else f"https://{self.host}"
+
+def _signature_algorithm(cert: x509.Certificate) -> str:
+    if cert.signature_algorithm_oid == SignatureAlgorithmOID.RSASSA_PSS:
+        return "RSASSA-PSS"
+    key = cert.public_key()
+    key_types = [(rsa.RSAPublicKey, "RSA"), (ec.EllipticCurvePublicKey, "ECDSA"), (dsa.DSAPublicKey, "DSA"),
+                 (ed25519.Ed25519PublicKey, "Ed25519"), (ed448.Ed448PublicKey, "Ed448")]
+    key_type = next((name for cls, name in key_types if isinstance(key, cls)), cert.signature_algorithm_oid.dotted_string)
+    hash_algorithm = cert.signature_hash_algorithm  # None for EdDSA, which has no separate hash
+    return f"{hash_algorithm.name.upper()}with{key_type}" if hash_algorithm else key_type
+
+def _merge_by_serial(certs: Iterable[DigitalCertificate]) -> List[DigitalCertificate]:
+    # The hub stores one record per serial, so a certificate found in several places (e.g. the VMCA root
+    # trusted by every vCenter) is collapsed into one record: fields come from the first record by
+    # (source, associated_asset) and associated_asset lists every location, so the result is stable between runs.
+    groups: Dict[str, List[DigitalCertificate]] = {}
+    for cert in certs:
+        groups.setdefault(cert.serial_number, []).append(cert)
+
+    merged = []
+    for serial in sorted(groups):
+        group = sorted(groups[serial], key=lambda c: (c.source, c.associated_asset or ""))
+        assets = {a for c in group if c.associated_asset for a in c.associated_asset.split(ASSET_SEPARATOR)}
+        merged.append(group[0].copy(update={"associated_asset": ASSET_SEPARATOR.join(sorted(assets)) or None}))
+    return merged
+
+class VMwareCollector:
+    def __init__(self, endpoints: List[VMwareEndpoint], username: str, password: str,
+                 timeout: float = 30.0, max_workers: int = 16, verify_ssl: bool = True):
+        self.endpoints = endpoints
+        self.username = username
+        self.password = password
+        self.timeout = timeout  # Default total time budget per endpoint (login plus all API calls)
+        self.max_workers = max_workers
+        self.verify_ssl = verify_ssl
+        self._sessions: Dict[VMwareEndpoint, requests.Session] = {}
+
+    def _budget(self, endpoint: VMwareEndpoint) -> float:
+        return endpoint.timeout if endpoint.timeout is not None else self.timeout
+
+    def _remaining(self, endpoint: VMwareEndpoint, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Time budget of {self._budget(endpoint)}s exhausted for {endpoint.host}")
+        return remaining
+
+    def _session(self, endpoint: VMwareEndpoint, deadline: float) -> requests.Session:
+        # One authenticated keep-alive session per endpoint, reused for every call until close()
+        session = self._sessions.get(endpoint)
+        if session is None:
+            session = requests.Session()
+            session.verify = self.verify_ssl
+            session.mount(endpoint.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            try:
+                self._authenticate(endpoint, session, deadline)
+            except Exception:
+                session.close()
+                raise
+            self._sessions[endpoint] = session
+        return session
+
+    def _authenticate(self, endpoint: VMwareEndpoint, session: requests.Session, deadline: float):
+        if endpoint.kind == "vcenter":
+            resp = session.post(f"{endpoint.base_url}/api/session",
+                                auth=(self.username, self.password), timeout=self._remaining(endpoint, deadline))
+            resp.raise_for_status()
+            session.headers["vmware-api-session-id"] = resp.json()
+        elif endpoint.kind == "nsx":
+            resp = session.post(f"{endpoint.base_url}/api/session/create",
+                                data={"j_username": self.username, "j_password": self.password},
+                                timeout=self._remaining(endpoint, deadline))
+            resp.raise_for_status()
+            # JSESSIONID is kept in the session cookie jar; the XSRF token must be echoed back
+            if "X-XSRF-TOKEN" in resp.headers:
+                session.headers["X-XSRF-TOKEN"] = resp.headers["X-XSRF-TOKEN"]
+        else:
+            raise ValueError(f"Unknown VMware endpoint kind: {endpoint.kind}")
+
+    def _logout(self, endpoint: VMwareEndpoint, session: requests.Session):
+        # Ends the server-side session so scheduled runs don't pile up against vCenter's session limit
+        try:
+            if endpoint.kind == "vcenter":
+                session.delete(f"{endpoint.base_url}/api/session", timeout=self._budget(endpoint))
+            else:
+                session.post(f"{endpoint.base_url}/api/session/destroy", timeout=self._budget(endpoint))
+        except Exception as e:
+            print(f"Error logging out of {endpoint.kind} {endpoint.host}: {e}")
+        finally:
+            session.close()
+
+    def _get(self, endpoint: VMwareEndpoint, path: str, deadline: float, params: Optional[dict] = None):
+        session = self._session(endpoint, deadline)
+        url = f"{endpoint.base_url}{path}"
+        resp = session.get(url, params=params, timeout=self._remaining(endpoint, deadline))
+        if resp.status_code == 401:
+            # Server-side session expired; log in again once and retry
+            self._authenticate(endpoint, session, deadline)
+            resp = session.get(url, params=params, timeout=self._remaining(endpoint, deadline))
+        resp.raise_for_status()
+        return resp.json()
+
+    def _fetch_vcenter_pems(self, endpoint: VMwareEndpoint, deadline: float) -> List[Tuple[str, str]]:
+        pems = []
+        tls = self._get(endpoint, "/api/vcenter/certificate-management/vcenter/tls", deadline)
+        pems.append((tls["cert"], "Machine SSL"))
+
+        chains = self._get(endpoint, "/api/vcenter/certificate-management/vcenter/trusted-root-chains", deadline)
+        for c in chains:
+            details = self._get(endpoint, f"/api/vcenter/certificate-management/vcenter/trusted-root-chains/{c['chain']}", deadline)
+            for pem in details.get("cert_chain", {}).get("cert_chain", []):
+                pems.append((pem, f"Trusted Root Chain {c['chain']}"))
+        return pems
+
+    def _fetch_nsx_pems(self, endpoint: VMwareEndpoint, deadline: float) -> List[Tuple[str, str]]:
+        pems = []
+        cursor = None
+        seen_cursors = set()
+        for _ in range(NSX_MAX_PAGES):
+            page = self._get(endpoint, "/api/v1/trust-management/certificates", deadline,
+                             params={"cursor": cursor} if cursor else None)
+            for c in page.get("results", []):
+                pems.append((c["pem_encoded"], c.get("display_name", c.get("id", "NSX certificate"))))
+            cursor = page.get("cursor")
+            if not cursor:
+                break
+            if cursor in seen_cursors:
+                print(f"NSX manager {endpoint.host} repeated cursor {cursor}, stopping pagination")
+                break
+            seen_cursors.add(cursor)
+        else:
+            print(f"NSX manager {endpoint.host} exceeded {NSX_MAX_PAGES} pages, stopping pagination")
+        return pems
+
+    def _parse_pem_chain(self, pem_chain: str, endpoint: VMwareEndpoint, asset: str) -> List[DigitalCertificate]:
+        certs = []
+        now = datetime.now(timezone.utc)
+        for block in PEM_PATTERN.findall(pem_chain):
+            try:
+                cert = x509.load_pem_x509_certificate(block.encode())
+
+                cn_attrs = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+                common_name = cn_attrs[0].value if cn_attrs else cert.subject.rfc4514_string()
+
+                san_entries = []
+                try:
+                    san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+                    san_entries = san.get_values_for_type(x509.DNSName) + [str(ip) for ip in san.get_values_for_type(x509.IPAddress)]
+                except x509.ExtensionNotFound:
+                    pass
+
+                valid_from = cert.not_valid_before_utc
+                valid_to = cert.not_valid_after_utc
+
+                certs.append(DigitalCertificate(
+                    common_name=common_name,
+                    san_entries=san_entries,
+                    serial_number=format(cert.serial_number, "x"),
+                    issuer=cert.issuer.rfc4514_string(),
+                    signature_algorithm=_signature_algorithm(cert),
+                    key_size=getattr(cert.public_key(), "key_size", 0),  # Ed25519/Ed448 keys have no size attribute
+                    valid_from=valid_from,
+                    valid_to=valid_to,
+                    chain_status=CertificateStatus.EXPIRED if valid_to < now else CertificateStatus.VALID,
+                    source=f"VMware {'vCenter' if endpoint.kind == 'vcenter' else 'NSX-T'}: {endpoint.host}",
+                    issuance_type="Manual",  # VMCA vs. custom CA signing is not exposed by these APIs
+                    associated_asset=f"{endpoint.host} ({asset})"
+                ))
+            except Exception as e:
+                print(f"Error parsing certificate from {endpoint.host} ({asset}): {e}")
+        return certs
+
+    def collect_endpoint(self, endpoint: VMwareEndpoint) -> List[DigitalCertificate]:
+        # Every call against the endpoint shares one deadline, so a slow or looping endpoint gives up on its own
+        deadline = time.monotonic() + self._budget(endpoint)
+        if endpoint.kind == "vcenter":
+            pems = self._fetch_vcenter_pems(endpoint, deadline)
+        else:
+            pems = self._fetch_nsx_pems(endpoint, deadline)
+
+        certs = []
+        for pem_chain, asset in pems:
+            certs.extend(self._parse_pem_chain(pem_chain, endpoint, asset))
+        return _merge_by_serial(certs)
+
+    def iter_certificates(self) -> Iterator[Tuple[VMwareEndpoint, List[DigitalCertificate]]]:
+        # Yields each endpoint's certificates as soon as that endpoint finishes
+        if not self.endpoints:
+            return
+        # Endpoints enforce their own budgets; this backstop only covers a worker that never returns
+        rounds = math.ceil(len(self.endpoints) / self.max_workers) + 1
+        backstop = rounds * max(self._budget(e) for e in self.endpoints)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {pool.submit(self.collect_endpoint, e): e for e in self.endpoints}
+        try:
+            for future in as_completed(futures, timeout=backstop):
+                endpoint = futures[future]
+                try:
+                    yield endpoint, future.result()
+                except Exception as e:
+                    print(f"Error collecting from {endpoint.kind} {endpoint.host}: {e}")
+        except FuturesTimeoutError:
+            pending = [e.host for f, e in futures.items() if not f.done()]
+            print(f"Gave up waiting for {len(pending)} endpoints after {backstop}s: {', '.join(pending)}")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def collect_certificates(self) -> List[DigitalCertificate]:
+        # One record per serial; certificates shared between endpoints list every location in associated_asset
+        certs = []
+        for _, batch in self.iter_certificates():
+            certs.extend(batch)
+        return _merge_by_serial(certs)
+
+    def _post_batch(self, hub: requests.Session, hub_url: str, batch: List[DigitalCertificate], label: str) -> bool:
+        try:
+            resp = hub.post(f"{hub_url}/ingest", data=IngestRequest(certificates=batch).json(),
+                            headers={"Content-Type": "application/json"}, timeout=self.timeout)
+            resp.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"Error sending {label} certificates to hub: {e}")
+            return False
+
+    def stream_to_hub(self, hub_url: str = "http://localhost:8000") -> int:
+        # Posts one ingest batch per endpoint as it completes instead of waiting for the slowest one.
+        # The hub keeps one record per serial (last write wins), so certificates seen on more than one
+        # endpoint are re-posted at the end as a single merged record listing every associated asset.
+        sent = set()
+        certs = []
+        endpoint_counts: Dict[str, int] = {}
+        with requests.Session() as hub:
+            for endpoint, batch in self.iter_certificates():
+                if not batch:
+                    continue
+                for cert in batch:
+                    endpoint_counts[cert.serial_number] = endpoint_counts.get(cert.serial_number, 0) + 1
+                certs.extend(batch)
+                if self._post_batch(hub, hub_url, batch, endpoint.host):
+                    sent.update(c.serial_number for c in batch)
+
+            shared = [c for c in _merge_by_serial(certs) if endpoint_counts[c.serial_number] > 1]
+            if shared and self._post_batch(hub, hub_url, shared, "shared"):
+                sent.update(c.serial_number for c in shared)
+        return len(sent)
+
+    def close(self):
+        if not self._sessions:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for endpoint, session in self._sessions.items():
+                pool.submit(self._logout, endpoint, session)
+        self._sessions.clear()
+
+    def run(self) -> IngestRequest:
+        print(f"Starting VMware Discovery across {len(self.endpoints)} endpoints...")
+        certs = self.collect_certificates()
+        print(f"Found {len(certs)} certificates.")
+        return IngestRequest(certificates=certs)
+
+if __name__ == "__main__":
+    import os
+    # VMWARE_VCENTERS / VMWARE_NSX_MANAGERS are comma-separated host lists
+    endpoints = [VMwareEndpoint(h.strip(), "vcenter") for h in os.environ.get("VMWARE_VCENTERS", "").split(",") if h.strip()]
+    endpoints += [VMwareEndpoint(h.strip(), "nsx") for h in os.environ.get("VMWARE_NSX_MANAGERS", "").split(",") if h.strip()]
+    collector = VMwareCollector(endpoints, os.environ.get("VMWARE_USERNAME", ""), os.environ.get("VMWARE_PASSWORD", ""))
+    try:
+        sent = collector.stream_to_hub(os.environ.get("HUB_URL", "http://localhost:8000"))
+        print(f"Sent {sent} certificates to hub.")
+    except Exception as e:
+        print(f"Collector failed (expected if no creds): {e}")
+    finally:
+        collector.close()
@@ -0,0 +1,266 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+# Ensure we are in the project root
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.getcwd())
+
+from src.collectors.vmware_collector import VMwareCollector, VMwareEndpoint
+
+LATENCY = 0.05  # Simulated per-request round trip to a vCenter/NSX manager
+VCENTERS = 40
+NSX_MANAGERS = 12
+ENDPOINT_TIMEOUT = 1.0  # Budget for the failure scenario endpoints
+HANG_SECONDS = 30  # How long the hanging vCenter stalls each call
+
+def make_pem(common_name: str) -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.now(timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now).not_valid_after(now + timedelta(days=365))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName(common_name)]), critical=False)
+            .sign(key, hashes.SHA256()))
+    return cert.public_bytes(serialization.Encoding.PEM).decode()
+
+def vcenter_responses(prefix: str, leaf_pem: str, root_pem: str) -> dict:
+    return {
+        f"{prefix}/api/vcenter/certificate-management/vcenter/tls": {"cert": leaf_pem},
+        f"{prefix}/api/vcenter/certificate-management/vcenter/trusted-root-chains": [{"chain": "root"}],
+        f"{prefix}/api/vcenter/certificate-management/vcenter/trusted-root-chains/root": {"cert_chain": {"cert_chain": [root_pem]}},
+    }
+
+def nsx_responses(prefix: str, leaf_pem: str, root_pem: str, cursor: str = None) -> dict:
+    page = {"results": [{"id": "mgr", "display_name": "Manager", "pem_encoded": leaf_pem + root_pem}]}
+    if cursor:
+        page["cursor"] = cursor
+    return {f"{prefix}/api/v1/trust-management/certificates": page}
+
+def build_responses(root_pem: str) -> dict:
+    # Recorded API responses keyed by path, one prefix per simulated endpoint
+    responses = {}
+    for i in range(VCENTERS):
+        responses.update(vcenter_responses(f"/vc{i:02d}", make_pem(f"vc{i:02d}.example.com"), root_pem))
+    for i in range(NSX_MANAGERS):
+        responses.update(nsx_responses(f"/nsx{i:02d}", make_pem(f"nsx{i:02d}.example.com"), root_pem))
+    # Failure scenarios: a hanging vCenter, a broken vCenter, an NSX manager that repeats its cursor,
+    # and a vCenter whose first session expires after one call
+    responses.update(vcenter_responses("/hang", make_pem("hang.example.com"), root_pem))
+    responses.update(vcenter_responses("/broken", make_pem("broken.example.com"), root_pem))
+    responses.update(nsx_responses("/loop", make_pem("loop.example.com"), root_pem, cursor="same"))
+    responses.update(vcenter_responses("/expire", make_pem("expire.example.com"), root_pem))
+    return responses
+
+class MockState:
+    def __init__(self, responses: dict):
+        self.responses = responses
+        self.lock = threading.Lock()
+        self.logins = Counter()
+        self.logouts = Counter()
+        self.sessions = {}  # prefix -> currently valid session token
+        self.ingested = []
+
+    def reset(self):
+        with self.lock:
+            self.logins.clear()
+            self.logouts.clear()
+            self.sessions.clear()
+            self.ingested.clear()
+
+def make_handler(state: MockState):
+    class MockVMwareHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so pooled sessions are actually reused
+
+        def _send(self, status: int, body=None, headers: dict = None):
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _token(self, prefix: str):
+            # vCenter sends the token in a header; NSX-T sends it as a cookie plus the matching XSRF header
+            if prefix == "/loop" or prefix.startswith("/nsx"):
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                token = cookie["JSESSIONID"].value if "JSESSIONID" in cookie else None
+                return token if self.headers.get("X-XSRF-TOKEN") == f"xsrf-{token}" else None
+            return self.headers.get("vmware-api-session-id")
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length", 0))
+            if length:
+                self.rfile.read(length)
+            time.sleep(LATENCY)
+            path = self.path.split("?")[0]
+            prefix = "/" + path.split("/")[1]
+
+            if path == "/ingest" and self.command == "POST":
+                with state.lock:
+                    state.ingested.append(json.loads(self._body))
+                return self._send(201, {"status": "success"})
+
+            if self.command == "POST" and path in (f"{prefix}/api/session", f"{prefix}/api/session/create"):
+                if path.endswith("/api/session") and not self.headers.get("Authorization", "").startswith("Basic "):
+                    return self._send(401)
+                with state.lock:
+                    state.logins[prefix] += 1
+                    token = f"{prefix[1:]}-{state.logins[prefix]}"
+                    state.sessions[prefix] = token
+                if path.endswith("/create"):
+                    return self._send(200, {}, {"Set-Cookie": f"JSESSIONID={token}; Path={prefix}", "X-XSRF-TOKEN": f"xsrf-{token}"})
+                return self._send(200, token)
+
+            with state.lock:
+                valid = prefix in state.sessions and self._token(prefix) == state.sessions[prefix]
+            if not valid:
+                return self._send(401)
+
+            if (self.command == "DELETE" and path == f"{prefix}/api/session") or \
+                    (self.command == "POST" and path == f"{prefix}/api/session/destroy"):
+                with state.lock:
+                    state.logouts[prefix] += 1
+                    del state.sessions[prefix]
+                return self._send(200 if self.command == "POST" else 204)
+
+            if prefix == "/hang":
+                time.sleep(HANG_SECONDS)
+            if prefix == "/broken":
+                return self._send(500, {"error": "internal"})
+            if prefix == "/expire":
+                with state.lock:
+                    if state.logins[prefix] == 1:
+                        del state.sessions[prefix]  # Expire the first session after this call
+            if path not in state.responses:
+                return self._send(404)
+            return self._send(200, state.responses[path])
+
+        def do_GET(self):
+            self._reply()
+
+        def do_DELETE(self):
+            self._reply()
+
+        def do_POST(self):
+            if self.path == "/ingest":
+                self._body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.headers.replace_header("Content-Length", "0")
+            self._reply()
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockVMwareHandler
+
+def healthy_endpoints(base_url: str):
+    endpoints = [VMwareEndpoint(f"{base_url}/vc{i:02d}", "vcenter") for i in range(VCENTERS)]
+    endpoints += [VMwareEndpoint(f"{base_url}/nsx{i:02d}", "nsx") for i in range(NSX_MANAGERS)]
+    return endpoints
+
+def timed_run(base_url: str, max_workers: int):
+    collector = VMwareCollector(healthy_endpoints(base_url), "reader", "secret", timeout=5, max_workers=max_workers)
+    start = time.perf_counter()
+    try:
+        certs = collector.collect_certificates()
+    finally:
+        collector.close()
+    return time.perf_counter() - start, certs
+
+def run_verification():
+    print("--- Starting VMware Collector Verification ---")
+    print("Starting mock vCenter/NSX-T server...")
+    state = MockState(build_responses(make_pem("VMCA Root")))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    endpoint_count = VCENTERS + NSX_MANAGERS
+    expected = endpoint_count + 1  # One leaf per endpoint plus the shared root
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"  [{'OK' if ok else 'FAIL'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    def check_sessions(label: str):
+        with state.lock:
+            check(len(state.logins) == endpoint_count and set(state.logins.values()) == {1},
+                  f"{label}: one login per endpoint ({sum(state.logins.values())} logins for {endpoint_count} endpoints)")
+            check(state.logouts == state.logins and not state.sessions,
+                  f"{label}: every server-side session ended ({sum(state.logouts.values())} logouts)")
+
+    try:
+        state.reset()
+        serial_time, serial_certs = timed_run(base_url, max_workers=1)
+        print(f"Serial run:     {len(serial_certs)} certificates in {serial_time:.2f}s")
+        check(len(serial_certs) == expected, f"serial run returned {expected} certificates")
+        check_sessions("serial run")
+
+        state.reset()
+        concurrent_time, concurrent_certs = timed_run(base_url, max_workers=16)
+        print(f"Concurrent run: {len(concurrent_certs)} certificates in {concurrent_time:.2f}s")
+        check(len(concurrent_certs) == expected, f"concurrent run returned {expected} certificates")
+        check_sessions("concurrent run")
+        print(f"Speedup: {serial_time / concurrent_time:.1f}x")
+
+        root_assets = [c.associated_asset for c in serial_certs + concurrent_certs if c.common_name == "VMCA Root"]
+        check(len(root_assets) == 2 and root_assets[0] == root_assets[1] and root_assets[0].count("; ") == endpoint_count - 1,
+              "shared root lists every endpoint and is identical between runs")
+
+        print("Failure scenarios...")
+        state.reset()
+        endpoints = healthy_endpoints(base_url) + [
+            VMwareEndpoint(f"{base_url}/hang", "vcenter", timeout=ENDPOINT_TIMEOUT),
+            VMwareEndpoint(f"{base_url}/broken", "vcenter", timeout=ENDPOINT_TIMEOUT),
+            VMwareEndpoint(f"{base_url}/loop", "nsx", timeout=ENDPOINT_TIMEOUT),
+            VMwareEndpoint(f"{base_url}/expire", "vcenter", timeout=ENDPOINT_TIMEOUT),
+        ]
+        collector = VMwareCollector(endpoints, "reader", "secret", timeout=5, max_workers=16)
+        start = time.perf_counter()
+        try:
+            sent = collector.stream_to_hub(base_url)
+        finally:
+            collector.close()
+        elapsed = time.perf_counter() - start
+        with state.lock:
+            posted = [c for batch in state.ingested for c in batch["certificates"]]
+            names = {c["common_name"] for c in posted}
+            logins = dict(state.logins)
+            open_sessions = dict(state.sessions)
+            last_root = [c for c in posted if c["common_name"] == "VMCA Root"][-1]
+
+        check(elapsed < HANG_SECONDS / 3, f"run with a hanging endpoint finished in {elapsed:.2f}s (endpoint stalls {HANG_SECONDS}s)")
+        check(sent == expected + 2, f"stream_to_hub sent {sent} certificates (expected {expected + 2})")
+        check("hang.example.com" not in names and "broken.example.com" not in names,
+              "hanging and failing endpoints produced no certificates")
+        check({"loop.example.com", "expire.example.com"} <= names, "repeated cursor and expired session still collected")
+        check(logins.get("/expire") == 2, f"expired session re-authenticated once ({logins.get('/expire')} logins)")
+        check(not open_sessions, f"no server-side sessions left open ({sorted(open_sessions)})")
+        check(last_root["associated_asset"].count("; ") == endpoint_count + 1,
+              "last posted root record lists every endpoint that trusts it")
+    finally:
+        print("Stopping mock server...")
+        server.shutdown()
+
+    if failures:
+        print(f"{len(failures)} checks failed.")
+        sys.exit(1)
+    print("All checks passed.")
+
+if __name__ == "__main__":
+    run_verification()